@@ -20,10 +20,12 @@ The JLS v2 reader and common definitions for JLS v2 file format use.
 
 from joulescope_ui import Metadata, time64
 from joulescope_ui.time_map import TimeMap
+import json
 import logging
+import os
 from pyjls import Reader, SignalType, data_type_as_str, DataType
-import copy
 import numpy as np
+from types import MappingProxyType
 
 
 class ChunkMeta:
@@ -39,30 +41,70 @@ DTYPE_MAP = {
 }
 
 
-TO_JLS_SIGNAL_NAME = {
+TO_JLS_SIGNAL_NAME = MappingProxyType({
     'i': 'current',
+    'current': 'current',
     'v': 'voltage',
+    'voltage': 'voltage',
     'p': 'power',
+    'power': 'power',
     'r': 'current_range',
+    'current_range': 'current_range',
     '0': 'gpi[0]',
+    'gpi[0]': 'gpi[0]',
     '1': 'gpi[1]',
+    'gpi[1]': 'gpi[1]',
     '2': 'gpi[2]',
+    'gpi[2]': 'gpi[2]',
     '3': 'gpi[3]',
+    'gpi[3]': 'gpi[3]',
     'T': 'trigger_in',
-}
-
-
-TO_UI_SIGNAL_NAME = {}
-
-
-def _init():
-    for key, value in list(TO_JLS_SIGNAL_NAME.items()):
-        TO_JLS_SIGNAL_NAME[value] = value
-        TO_UI_SIGNAL_NAME[value] = key
-        TO_UI_SIGNAL_NAME[key] = key
-
-
-_init()
+    'trigger_in': 'trigger_in',
+})
+
+
+TO_UI_SIGNAL_NAME = MappingProxyType({
+    'i': 'i',
+    'current': 'i',
+    'v': 'v',
+    'voltage': 'v',
+    'p': 'p',
+    'power': 'p',
+    'r': 'r',
+    'current_range': 'r',
+    '0': '0',
+    'gpi[0]': '0',
+    '1': '1',
+    'gpi[1]': '1',
+    '2': '2',
+    'gpi[2]': '2',
+    '3': '3',
+    'gpi[3]': '3',
+    'T': 'T',
+    'trigger_in': 'T',
+})
+
+
+_UTC_CACHE_EXT = '.utccache'
+_UTC_TAIL_WINDOW = 60  # in seconds
+_utc_endpoints_cache = {}  # (path, mtime) -> {signal_id: (utc_first, utc_last)}
+
+
+def _utc_cache_get(path):
+    """Get the UTC endpoints cache for the current version of a file.
+
+    :param path: The JLS file path.
+    :return: (mtime, {signal_id: (utc_first, utc_last)}).
+    """
+    realpath, mtime = os.path.realpath(path), os.path.getmtime(path)
+    key = (realpath, mtime)
+    signals = _utc_endpoints_cache.get(key)
+    if signals is None:
+        for k in [k for k in _utc_endpoints_cache.keys() if k[0] == realpath]:
+            del _utc_endpoints_cache[k]  # stale, file modified
+        signals = {}
+        _utc_endpoints_cache[key] = signals
+    return mtime, signals
 
 
 class JlsV2:
@@ -72,13 +114,84 @@ class JlsV2:
         self._path = path
         self._jls = None
         self._signals = {}
+        self._utc_mtime = None
+        self._utc_cache = {}
+        self._utc_cache_dirty = False
         self.open(pubsub, topic)
 
+    def _utc_cache_load(self):
+        self._utc_mtime, self._utc_cache = _utc_cache_get(self._path)
+        try:
+            with open(self._path + _UTC_CACHE_EXT, 'rt') as f:
+                data = json.load(f)
+            if data['mtime'] != self._utc_mtime:
+                return
+            for signal_id, (utc_first, utc_last) in data['signals'].items():
+                self._utc_cache.setdefault(int(signal_id), (utc_first, utc_last))
+        except FileNotFoundError:
+            pass
+        except Exception:
+            self._log.warning('Could not load UTC cache for %s', self._path)
+
+    def _utc_cache_save(self):
+        if not self._utc_cache_dirty:
+            return
+        self._utc_cache_dirty = False
+        try:
+            signals = {str(signal_id): value for signal_id, value in self._utc_cache.items()}
+            data = {'mtime': self._utc_mtime, 'signals': signals}
+            with open(self._path + _UTC_CACHE_EXT, 'wt') as f:
+                json.dump(data, f)
+        except Exception:
+            self._log.warning('Could not save UTC cache for %s', self._path)
+
+    def _utc_endpoints(self, signal):
+        """Get the first and last UTC entries for a signal.
+
+        :param signal: The pyjls signal definition.
+        :return: (utc_first, utc_last) where each is None or
+            [sample_id, utc_time64].
+        """
+        if signal.signal_id in self._utc_cache:
+            return self._utc_cache[signal.signal_id]
+        utc_first = None
+        utc_last = None
+
+        def utc_first_cbk(entries):
+            nonlocal utc_first
+            if len(entries):
+                utc_first = entries[0, :]
+                return True
+            return False
+
+        def utc_last_cbk(entries):
+            nonlocal utc_last
+            if len(entries):
+                utc_last = entries[-1, :]
+            return False
+
+        self._jls.utc(signal.signal_id, 0, utc_first_cbk)
+        if utc_first is not None:
+            # only read the tail, widening the window until an entry is found
+            window = max(1, int(signal.sample_rate * _UTC_TAIL_WINDOW))
+            while utc_last is None:
+                sample_id = max(0, signal.length - window)
+                self._jls.utc(signal.signal_id, sample_id, utc_last_cbk)
+                if sample_id == 0:
+                    break
+                window *= 16
+            utc_first = [int(x) for x in utc_first]
+            utc_last = [int(x) for x in utc_last]
+        self._utc_cache[signal.signal_id] = (utc_first, utc_last)
+        self._utc_cache_dirty = True
+        return utc_first, utc_last
+
     def open(self, pubsub, topic):
         if self._jls is not None:
             self.close()
         jls = Reader(self._path)
         self._jls = jls
+        self._utc_cache_load()
         source_meta = {}
 
         def on_user_data_notes(chunk_meta_u16, data):
@@ -109,17 +222,7 @@ class JlsV2:
             if signal.name not in TO_UI_SIGNAL_NAME:
                 continue  # unsupported by UI, skip
             if signal.signal_type == SignalType.FSR:
-                utc_first = None
-                utc_last = None
-
-                def utc_cbk(entries):
-                    nonlocal utc_first, utc_last
-                    if utc_first is None:
-                        utc_first = entries[0, :]
-                    utc_last = entries[-1, :]
-                    return False
-
-                jls.utc(signal.signal_id, 0, utc_cbk)
+                utc_first, utc_last = self._utc_endpoints(signal)
                 g = signal.sample_rate / time64.SECOND
                 if utc_first is None:
                     time_map.update(0, 0, g)
@@ -130,7 +233,7 @@ class JlsV2:
                     d_sample = utc_last[0] - utc_first[0]
                     time_map.update(utc_first[0], utc_first[1], d_sample / d_utc)
 
-            signal_meta = copy.deepcopy(source_meta[signal.source_id])
+            signal_meta = dict(source_meta[signal.source_id])  # values are all str
             source_name = signal_meta['name']
             signal_subname = TO_UI_SIGNAL_NAME[signal.name]
             signal_name = f'{source_name}.{signal_subname}'
@@ -141,8 +244,10 @@ class JlsV2:
                              Metadata('obj', 'Signal metadata', default=signal_meta,
                                       flags=['hide', 'ro', 'skip_undo']))
             sample_start, sample_end = 0, signal.length - 1
+            utc_start = time_map.counter_to_time64(sample_start)
+            utc_end = time_map.counter_to_time64(sample_end)
             range_meta = {
-                'utc': [time_map.counter_to_time64(sample_start), time_map.counter_to_time64(sample_end)],
+                'utc': [utc_start, utc_end],
                 'samples': {'start': sample_start, 'end': sample_end, 'length': signal.length},
                 'sample_rate': signal.sample_rate,
             }
@@ -168,33 +273,33 @@ class JlsV2:
         """
         if self._jls is None:
             return None
-        signal_id = '.'.join(req['signal_id'].split('.')[-2:])
-        signal = self._signals[signal_id]
+        signal = self._signals['.'.join(req['signal_id'].split('.')[-2:])]
         signal_id = signal['signal_id']
+        sample_rate = signal['sample_rate']
+        field = signal['field']
+        units = signal['units']
+        data_type = signal['data_type']
+        tm = signal['time_map']
         req_end = req.get('end', 0)
         length = req.get('length', 0)
         if req['time_type'] == 'utc':
-            time_map = signal['time_map']
-            start = time_map.time64_to_counter(req['start'], dtype=np.int64)
-            end = time_map.time64_to_counter(req_end, dtype=np.int64)
+            start = tm.time64_to_counter(req['start'], dtype=np.int64)
+            end = tm.time64_to_counter(req_end, dtype=np.int64)
         else:
             start = req['start']
             end = req_end
+        # use Python ints, not numpy scalars, for the sample arithmetic below
+        start, end = int(start), int(end)
+        length = int(length) if length else 0
         interval = end - start + 1
+        if req_end and interval < 0:
+            # self._log.warning('req with interval < 0: %r', req)
+            return None
         response_type = 'samples'
         increment = 1
-        data_type = signal['data_type']
+        use_stats = bool(req_end and length and length <= (interval // 2))
 
-        if not req_end:
-            # self._log.info('fsr(%d, %d, %d)', signal_id, start, length)
-            data = self._jls.fsr(signal_id, start, length)
-        elif interval < 0:
-            # self._log.warning('req with interval < 0: %r', req)
-            return None
-        elif not length:
-            # self._log.info('fsr(%d, %d, %d)', signal_id, start, interval)
-            data = self._jls.fsr(signal_id, start, interval)
-        elif length and req_end and length <= (interval // 2):
+        if use_stats:
             # round increment down
             increment = interval // length
             length = interval // increment
@@ -202,20 +307,27 @@ class JlsV2:
             data = self._jls.fsr_statistics(signal_id, start, increment, length)
             response_type = 'summary'
             data_type = 'f32'
+        elif not req_end:
+            # self._log.info('fsr(%d, %d, %d)', signal_id, start, length)
+            data = self._jls.fsr(signal_id, start, length)
+        elif not length:
+            # self._log.info('fsr(%d, %d, %d)', signal_id, start, interval)
+            data = self._jls.fsr(signal_id, start, interval)
         else:
             length = interval
             # self._log.info('fsr(%d, %d, %d)', signal_id, start, length)
             data = self._jls.fsr(signal_id, start, length)
         sample_id_end = start + increment * length - 1
-        time_map = signal['time_map']
+        utc_start = tm.counter_to_time64(start)
+        utc_end = tm.counter_to_time64(sample_id_end)
 
         info = {
             'version': 1,
-            'field': signal['field'],
-            'units': signal['units'],
+            'field': field,
+            'units': units,
             'time_range_utc': {
-                'start': time_map.counter_to_time64(start),
-                'end': time_map.counter_to_time64(sample_id_end),
+                'start': utc_start,
+                'end': utc_end,
                 'length': length,
             },
             'time_range_samples': {
@@ -224,9 +336,9 @@ class JlsV2:
                 'length': length,
             },
             'time_map': {
-                'offset_time': time_map.time_offset,
-                'offset_counter': time_map.counter_offset,
-                'counter_rate': signal['sample_rate'],
+                'offset_time': tm.time_offset,
+                'offset_counter': tm.counter_offset,
+                'counter_rate': sample_rate,
             },
         }
         # self._log.info(info)
@@ -243,4 +355,5 @@ class JlsV2:
         jls, self._jls = self._jls, None
         if jls is not None:
             jls.close()
+            self._utc_cache_save()
 
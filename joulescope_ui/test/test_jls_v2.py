@@ -0,0 +1,164 @@
+# Copyright 2024 Jetperch LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Test the JLS v2 reader UTC endpoints cache.
+"""
+
+import unittest
+from unittest.mock import Mock
+from joulescope_ui import jls_v2, time64
+from joulescope_ui.jls_v2 import JlsV2
+from pyjls import Reader, Writer
+import json
+import numpy as np
+import os
+import tempfile
+
+
+_SAMPLE_RATE = 100
+_LENGTH = 200000   # 2000 seconds
+_UTC_INTERVAL = 10000
+_UTC_END = 150000  # last UTC entry, 500 seconds before the end
+_UTC_START = 1_000_000 * time64.SECOND
+_SIGNAL_NAME = 'm-s.i'
+
+
+def _utc_full_scan(path, signal_id):
+    utc_first = None
+    utc_last = None
+
+    def utc_cbk(entries):
+        nonlocal utc_first, utc_last
+        if utc_first is None:
+            utc_first = entries[0, :]
+        utc_last = entries[-1, :]
+        return False
+
+    r = Reader(path)
+    try:
+        r.utc(signal_id, 0, utc_cbk)
+    finally:
+        r.close()
+    return utc_first, utc_last
+
+
+class TestJlsV2UtcCache(unittest.TestCase):
+
+    def setUp(self):
+        jls_v2._utc_endpoints_cache.clear()
+        self._tempdir = tempfile.TemporaryDirectory()
+        self._path = os.path.join(self._tempdir.name, 'test.jls')
+
+    def tearDown(self):
+        jls_v2._utc_endpoints_cache.clear()
+        self._tempdir.cleanup()
+
+    def _write(self, utc=True):
+        with Writer(self._path) as w:
+            w.source_def(source_id=1, name='src', vendor='v', model='m', version='1', serial_number='s')
+            w.signal_def(signal_id=1, source_id=1, sample_rate=_SAMPLE_RATE, name='current', units='A')
+            if utc:
+                for sample_id in range(0, _UTC_END + 1, _UTC_INTERVAL):
+                    # slightly fast clock, so d_sample / d_utc != sample_rate
+                    t = _UTC_START + (sample_id * time64.SECOND * 1001) // (_SAMPLE_RATE * 1000)
+                    w.utc(1, sample_id, t)
+            w.fsr(1, 0, np.zeros(_LENGTH, dtype=np.float32))
+
+    def _open(self):
+        pubsub = Mock()
+        jls = JlsV2(self._path, pubsub, 'registry/JlsSource:001')
+        rng = None
+        for c in pubsub.topic_add.call_args_list:
+            if c.args[0].endswith(f'/signals/{_SIGNAL_NAME}/range'):
+                rng = c.args[1].default
+        return jls, rng
+
+    def _expected(self):
+        utc_first, utc_last = _utc_full_scan(self._path, 1)
+        d_utc = int(utc_last[1] - utc_first[1])
+        d_sample = int(utc_last[0] - utc_first[0])
+        return [int(x) for x in utc_first], [int(x) for x in utc_last], d_sample / d_utc
+
+    def _sidecar_path(self):
+        return self._path + jls_v2._UTC_CACHE_EXT
+
+    def _sidecar_shift(self, dt):
+        with open(self._sidecar_path(), 'rt') as f:
+            data = json.load(f)
+        for entry in data['signals'].values():
+            for e in entry:
+                e[1] += dt
+        with open(self._sidecar_path(), 'wt') as f:
+            json.dump(data, f)
+
+    def test_matches_full_scan(self):
+        self._write()
+        utc_first, utc_last, scale = self._expected()
+        self.assertEqual(_UTC_END, utc_last[0])
+        # last entry is outside the first tail window, must widen the search
+        self.assertGreater((_LENGTH - _UTC_END) / _SAMPLE_RATE, jls_v2._UTC_TAIL_WINDOW)
+        jls, rng = self._open()
+        try:
+            self.assertEqual([utc_first, utc_last], list(jls._utc_cache[1]))
+            tm = jls._signals[_SIGNAL_NAME]['time_map']
+            self.assertEqual(utc_first[0], tm.counter_offset)
+            self.assertEqual(utc_first[1], tm.time_offset)
+            self.assertEqual(scale, tm.time_to_counter_scale)
+            self.assertEqual([tm.counter_to_time64(0), tm.counter_to_time64(_LENGTH - 1)], rng['utc'])
+            self.assertEqual({'start': 0, 'end': _LENGTH - 1, 'length': _LENGTH}, rng['samples'])
+        finally:
+            jls.close()
+
+    def test_sidecar_reused(self):
+        self._write()
+        jls, rng1 = self._open()
+        jls.close()
+        self.assertTrue(os.path.isfile(self._sidecar_path()))
+
+        jls_v2._utc_endpoints_cache.clear()
+        self._sidecar_shift(time64.SECOND)
+        jls, rng2 = self._open()
+        jls.close()
+        self.assertEqual([t + time64.SECOND for t in rng1['utc']], rng2['utc'])
+
+    def test_mtime_invalidates(self):
+        self._write()
+        jls, rng1 = self._open()
+        jls.close()
+        self._sidecar_shift(time64.SECOND)
+        st = os.stat(self._path)
+        os.utime(self._path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        jls, rng2 = self._open()
+        jls.close()
+        self.assertEqual(rng1['utc'], rng2['utc'])
+        realpath = os.path.realpath(self._path)
+        keys = [k for k in jls_v2._utc_endpoints_cache.keys() if k[0] == realpath]
+        self.assertEqual(1, len(keys))
+
+    def test_no_utc(self):
+        self._write(utc=False)
+        jls, rng1 = self._open()
+        self.assertEqual((None, None), jls._utc_cache[1])
+        jls.close()
+        with open(self._sidecar_path(), 'rt') as f:
+            data = json.load(f)
+        self.assertEqual([None, None], data['signals']['1'])
+
+        jls_v2._utc_endpoints_cache.clear()
+        jls, rng2 = self._open()
+        jls.close()
+        self.assertEqual((None, None), jls._utc_cache[1])
+        self.assertEqual(rng1, rng2)
@@ -17,7 +17,6 @@ from joulescope_ui import N_, register
 from joulescope_ui.tooltip import tooltip_format
 from joulescope_ui.styles import styled_widget, color_as_qcolor, font_as_qfont
 from joulescope_ui.units import elapsed_time_formatter
-import numpy as np
 import os
 import psutil
 
@@ -28,26 +27,35 @@ _TOPIC_DURATION = f'{_TOPIC}/settings/duration'
 _GB_FACTOR = 1024 ** 3
 _SZ_MIN = int(0.01 * _GB_FACTOR)
 _COLOR_TEXT = '   '
+_PROC = None  # psutil.Process, created on first use
 
 
 def _mem_proc():
-    return psutil.Process(os.getpid()).memory_info().rss
+    global _PROC
+    if _PROC is None:
+        _PROC = psutil.Process(os.getpid())
+    return _PROC.memory_info().rss
 
 
-def _format(sz):
-    sz = sz / _GB_FACTOR
-    return f'{sz:.2f}'
+def _format(sz_gb):
+    return f'{sz_gb:.2f}'
 
 
 class MemSet(QtWidgets.QWidget):
 
     def __init__(self, parent=None):
-        self.sizes = np.array([0, 0, 0, 1], dtype=float)
+        self._base = 0.0
+        self._size = 0.0
+        self._available = 0.0
+        self._used = 1.0
         super().__init__(parent=parent)
         self._height = 30
         self._x_pos = 0
         self._drag = None
         self._width = 1
+        self._pixels = None
+        self._brush_key = None
+        self._brush_cache = None
         self.setMinimumHeight(self._height)
         self.setMaximumHeight(self._height)
         self.setMouseTracking(True)
@@ -60,25 +68,22 @@ class MemSet(QtWidgets.QWidget):
 
     def update(self, base, available, used):
         if self._drag is None:
-            self.sizes[0] = base
-            self.sizes[2] = available
-            self.sizes[3] = used
-            self.repaint()
+            self._base, self._available, self._used = base, available, used
+            if self._pixel_boundaries() != self._pixels:
+                super().update()
 
     def update_size(self, size):
         if self._drag is None:
-            self.sizes[1] = size
+            self._size = size
 
     def show_size(self, size):
         self.parent()._on_size(size)
-        self.repaint()
+        super().update()
 
     def _pixel_boundaries(self):
-        w = self.width()
-        sizes = np.array(self.sizes, dtype=float)
-        total = np.sum(sizes)
-        pixels = np.rint(sizes * (w / total)).astype(np.uint64)
-        return pixels
+        base, size, available, used = self._base, self._size, self._available, self._used
+        scale = self.width() / (base + size + available + used)
+        return round(base * scale), round(size * scale), round(available * scale), round(used * scale)
 
     def paintEvent(self, event):
         if self.parent().style_obj is None:
@@ -88,21 +93,19 @@ class MemSet(QtWidgets.QWidget):
         p = QtGui.QPainter(self)
 
         pixels = self._pixel_boundaries()
-        self._width = np.sum(pixels)
+        self._pixels = pixels
+        self._width = sum(pixels)
 
-        colors = [
-            color_as_qcolor(v['memory.base']),
-            color_as_qcolor(v['memory.size']),
-            color_as_qcolor(v['memory.available']),
-            color_as_qcolor(v['memory.used']),
-        ]
+        key = (v['memory.base'], v['memory.size'], v['memory.available'], v['memory.used'])
+        if key != self._brush_key:
+            self._brush_cache = [QtGui.QBrush(color_as_qcolor(c)) for c in key]
+            self._brush_key = key
+        brushes = self._brush_cache
 
         x = 0
         for idx, pixel in enumerate(pixels):
-            b1 = QtGui.QBrush(colors[idx])
-            p.setBrush(b1)
             if pixel:
-                p.fillRect(x, 0, pixel, widget_h, b1)
+                p.fillRect(x, 0, pixel, widget_h, brushes[idx])
             x += pixel
             if idx == 1:
                 self._x_pos = x
@@ -119,38 +122,38 @@ class MemSet(QtWidgets.QWidget):
             cursor = self._CURSOR_ARROW
         self.setCursor(cursor)
         if self._drag is not None:
-            total = np.sum(self.sizes)
-            sz = x / self._width * total - self.sizes[0]
-            sz_max = self.sizes[1] + self.sizes[2]
+            total = self._base + self._size + self._available + self._used
+            sz = x / self._width * total - self._base
+            sz_max = self._size + self._available
             sz = max(_SZ_MIN, min(sz, sz_max))
-            dsz = sz - self.sizes[1]
-            self.sizes[1] += dsz
-            self.sizes[2] -= dsz
+            dsz = sz - self._size
+            self._size += dsz
+            self._available -= dsz
             self.show_size(sz)
 
     def abort(self):
         if self._drag is None:
             return
         self.show_size(self._drag[1])
-        self.sizes, self._drag = self._drag, None
+        (self._base, self._size, self._available, self._used), self._drag = self._drag, None
 
     def mousePressEvent(self, event):
         event.accept()
         x = event.position().x()
         if event.button() == QtCore.Qt.LeftButton:
             if self._drag is None and self.is_mouse_active(x):
-                self._drag = np.copy(self.sizes)
+                self._drag = (self._base, self._size, self._available, self._used)
         elif self._drag is not None:
             self.abort()
-        self.repaint()
+        super().update()
 
     def mouseReleaseEvent(self, event):
         event.accept()
         if self._drag is None:
             return
         if event.button() == QtCore.Qt.LeftButton:
-            self.parent().size = self.sizes[1]
             self._drag = None
+            self.parent().size = self._size
         else:
             self.abort()
 
@@ -186,6 +189,7 @@ class MemoryWidget(QtWidgets.QWidget):
         self._size = 0  # in bytes
         self._used = 0
         self._timer = None
+        self._last_gb = {'used_value': None, 'available_value': None, 'size_value': None}
         super().__init__(parent=parent)
         self.setObjectName('memory_widget')
         self.setSizePolicy(QtWidgets.QSizePolicy.Preferred, QtWidgets.QSizePolicy.Preferred)
@@ -211,7 +215,7 @@ class MemoryWidget(QtWidgets.QWidget):
             'size_units': QtWidgets.QLabel('GB', self._grid_widget),
             'total_color': QtWidgets.QLabel(_COLOR_TEXT, self._grid_widget),
             'total_label': QtWidgets.QLabel(N_('Total RAM size'), self._grid_widget),
-            'total_value': QtWidgets.QLabel(_format(vm.total), self._grid_widget),
+            'total_value': QtWidgets.QLabel(_format(vm.total / _GB_FACTOR), self._grid_widget),
             'total_units': QtWidgets.QLabel('GB', self._grid_widget),
             'available_color': QtWidgets.QLabel(_COLOR_TEXT, self._grid_widget),
             'available_label': QtWidgets.QLabel(N_('Available RAM size'), self._grid_widget),
@@ -247,20 +251,25 @@ class MemoryWidget(QtWidgets.QWidget):
         self._spacer = QtWidgets.QSpacerItem(0, 0, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
         self._layout.addItem(self._spacer)
 
+    def _set_gb(self, key, sz_gb):
+        sz_gb = round(sz_gb, 2)
+        if sz_gb != self._last_gb[key]:
+            self._widgets[key].setText(_format(sz_gb))
+            self._last_gb[key] = sz_gb
+
     def _update(self, size=None):
         if size is None:
             size = self._size
         vm = psutil.virtual_memory()
-        my_mem = psutil.Process(os.getpid()).memory_info().rss
+        my_mem = _mem_proc()
 
         used = vm.used - my_mem
-        s = _format(used)
-        self._widgets['used_value'].setText(s)
+        self._set_gb('used_value', used / _GB_FACTOR)
 
         available = vm.total - (self._base + size + used)
-        self._mem_size_widget.max_set(available / _GB_FACTOR)
-        s = _format(available)
-        self._widgets['available_value'].setText(s)
+        available_gb = available / _GB_FACTOR
+        self._mem_size_widget.max_set(available_gb)
+        self._set_gb('available_value', available_gb)
         self._memset.update(self._base, available, used)
 
     def on_pubsub_register(self):
@@ -289,6 +298,7 @@ class MemoryWidget(QtWidgets.QWidget):
                 self._clear_on_play.setToolTip(tooltip_format(meta.brief, meta.detail))
 
             self._timer.start(1000)
+            return  # the retained _TOPIC_SIZE subscribe already called _update
         if not self._memset.is_active:
             self._update()
 
@@ -311,13 +321,13 @@ class MemoryWidget(QtWidgets.QWidget):
 
     def _on_size(self, value):
         self._size = int(value)
-        s = _format(self._size)
-        self._widgets['size_value'].setText(s)
+        self._set_gb('size_value', self._size / _GB_FACTOR)
         self._memset.update_size(value)
         self._update(value)
 
     @QtCore.Slot(str)
     def _on_mem_size_text(self, size):
+        self._last_gb['size_value'] = None  # user edited, always reformat
         self.size = size
         self._on_size(size)
 